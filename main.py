@@ -4,10 +4,14 @@ Main application file with API endpoints for license plate detection and OCR.
 """
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, Any
+import asyncio
 import logging
+import os
+import cv2
 
 from utils import ImageHandler, PlateDetector, OCRProcessor
 
@@ -34,12 +38,39 @@ app.add_middleware(
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Worker threads for the blocking image/OCR pipeline
+MAX_WORKERS = os.cpu_count() or 1
+# Seconds a worker waits for its OCR batch before giving up
+OCR_TIMEOUT = 30
+
 # Initialize processors
 image_handler = ImageHandler()
 plate_detector = PlateDetector()
 ocr_processor = OCRProcessor(languages=['en'], gpu=False)
 
 
+@app.on_event("startup")
+async def startup():
+    """Create the worker pool, warm the models up and start OCR micro-batching."""
+    app.state.pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    app.state.semaphore = asyncio.Semaphore(MAX_WORKERS * 2)
+    
+    # Keep cold-start costs (weight loading, cuDNN autotuning) off the first request
+    logger.info("Warming up models...")
+    ocr_processor.warmup()
+    plate_detector.warmup()
+    
+    ocr_processor.start_batching()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Drain the worker pool, then stop the OCR batching worker."""
+    # Workers may still be waiting on OCR batches, so don't block the loop
+    await asyncio.get_running_loop().run_in_executor(None, app.state.pool.shutdown)
+    await ocr_processor.stop_batching()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Serve the main HTML page."""
@@ -59,6 +90,106 @@ async def health_check():
     return {"status": "healthy", "service": "License Plate OCR API"}
 
 
+def _process(file_content: bytes, content_type: str, loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
+    """
+    Run the detection and OCR pipeline on an uploaded image.
+    
+    Runs on the worker pool; OCR is handed back to the event loop so that
+    concurrent requests share batches.
+    
+    Args:
+        file_content: Raw uploaded bytes
+        content_type: MIME type of the upload
+        loop: Event loop running the OCR batching worker
+        
+    Returns:
+        Response content with plate text, confidence, and processed images
+    """
+    # Validate image
+    is_valid, error_msg = image_handler.validate_image(file_content, content_type)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=error_msg)
+    
+    # Convert to OpenCV format
+    img = image_handler.bytes_to_cv2(file_content)
+    
+    if img is None:
+        raise HTTPException(status_code=400, detail="Failed to process image")
+    
+    # Resize if needed and convert to grayscale once for the whole pipeline;
+    # keep the frame on the GPU when the CUDA cascade will consume it
+    gray = gpu_gray = None
+    if plate_detector.gpu_cascade is not None and plate_detector.onnx_detector is None:
+        img, gpu_gray = image_handler.resize_and_gray_gpu(img)
+    else:
+        img = image_handler.resize_if_needed(img)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    
+    # Detect license plate
+    logger.info("Detecting license plate...")
+    plate_result = plate_detector.get_best_plate(img, gray=gray, gpu_gray=gpu_gray)
+    
+    if plate_result is None:
+        return {
+            "success": False,
+            "message": "No license plate detected in the image",
+            "plate_text": None,
+            "confidence": 0.0,
+            "original_image": image_handler.cv2_to_base64(img, ImageHandler.PREVIEW_MAX_DIMENSION),
+            "plate_image": None
+        }
+    
+    plate_img, bbox = plate_result
+    x, y, w, h = bbox
+    
+    # Extract text using OCR (EasyOCR does its own preprocessing)
+    logger.info("Extracting text from license plate...")
+    if ocr_processor.batching:
+        ocr_future = asyncio.run_coroutine_threadsafe(
+            ocr_processor.extract_plate_number_async(plate_img), loop
+        )
+        try:
+            ocr_result = ocr_future.result(timeout=OCR_TIMEOUT)
+        except FutureTimeoutError:
+            ocr_future.cancel()
+            raise HTTPException(status_code=504, detail="Timed out waiting for OCR")
+    else:
+        # Already on a worker thread, so run OCR here rather than via the loop
+        ocr_result = ocr_processor.extract_plate_number(plate_img)
+    
+    # plate_img is a view into img, so encode it before drawing on img
+    plate_image = image_handler.cv2_to_base64(plate_img)
+    
+    # Draw bounding box on original image; img isn't used afterwards
+    img_with_box = plate_detector.draw_plates(img, [bbox], in_place=True)
+    original_image = image_handler.cv2_to_base64(img_with_box, ImageHandler.PREVIEW_MAX_DIMENSION)
+    
+    if ocr_result is None:
+        return {
+            "success": False,
+            "message": "License plate detected but no text could be extracted",
+            "plate_text": None,
+            "confidence": 0.0,
+            "original_image": original_image,
+            "plate_image": plate_image
+        }
+    
+    plate_text, confidence = ocr_result
+    
+    # Format response
+    logger.info(f"Successfully extracted plate: {plate_text} (confidence: {confidence:.2f})")
+    
+    return {
+        "success": True,
+        "message": "License plate successfully detected and extracted",
+        "plate_text": plate_text,
+        "confidence": float(confidence),
+        "original_image": original_image,
+        "plate_image": plate_image,
+        "bounding_box": {"x": x, "y": y, "width": w, "height": h}
+    }
+
+
 @app.post("/upload")
 async def upload_image(file: UploadFile = File(...)) -> Dict[str, Any]:
     """
@@ -74,80 +205,15 @@ async def upload_image(file: UploadFile = File(...)) -> Dict[str, Any]:
         # Read file content
         file_content = await file.read()
         
-        # Validate image
-        is_valid, error_msg = image_handler.validate_image(file_content, file.content_type)
-        if not is_valid:
-            raise HTTPException(status_code=400, detail=error_msg)
-        
-        # Convert to OpenCV format
-        img = image_handler.bytes_to_cv2(file_content)
-        
-        if img is None:
-            raise HTTPException(status_code=400, detail="Failed to process image")
-        
-        # Resize if needed
-        img = image_handler.resize_if_needed(img)
-        
-        # Detect license plate
-        logger.info("Detecting license plate...")
-        plate_result = plate_detector.get_best_plate(img)
-        
-        if plate_result is None:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": False,
-                    "message": "No license plate detected in the image",
-                    "plate_text": None,
-                    "confidence": 0.0,
-                    "original_image": image_handler.cv2_to_base64(img),
-                    "plate_image": None
-                }
-            )
-        
-        plate_img, bbox = plate_result
-        x, y, w, h = bbox
-        
-        # Draw bounding box on original image
-        img_with_box = plate_detector.draw_plates(img, [bbox])
-        
-        # Preprocess plate image for OCR
-        logger.info("Extracting text from license plate...")
-        plate_preprocessed = image_handler.preprocess_for_ocr(plate_img)
-        
-        # Extract text using OCR
-        ocr_result = ocr_processor.extract_plate_number(plate_img)
-        
-        if ocr_result is None:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": False,
-                    "message": "License plate detected but no text could be extracted",
-                    "plate_text": None,
-                    "confidence": 0.0,
-                    "original_image": image_handler.cv2_to_base64(img_with_box),
-                    "plate_image": image_handler.cv2_to_base64(plate_img)
-                }
+        # Queue excess clients here instead of piling work onto the pool
+        async with app.state.semaphore:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                app.state.pool, _process, file_content, file.content_type, loop
             )
         
-        plate_text, confidence = ocr_result
-        
-        # Format response
-        logger.info(f"Successfully extracted plate: {plate_text} (confidence: {confidence:.2f})")
-        
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "message": "License plate successfully detected and extracted",
-                "plate_text": plate_text,
-                "confidence": float(confidence),
-                "original_image": image_handler.cv2_to_base64(img_with_box),
-                "plate_image": image_handler.cv2_to_base64(plate_img),
-                "bounding_box": {"x": x, "y": y, "width": w, "height": h}
-            }
-        )
+        # orjson serialises the multi-MB base64 strings much faster than json
+        return ORJSONResponse(status_code=200, content=result)
         
     except HTTPException:
         raise
@@ -0,0 +1,34 @@
+"""
+JIT-compiled helpers for hot numeric loops.
+Falls back to plain Python when numba is not installed.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op stand-in for `numba.njit`."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def _filter_rects(rects):
+    """
+    Mask bounding rects whose aspect ratio looks like a license plate.
+    
+    Args:
+        rects: (N, 4) int32 array of (x, y, w, h)
+        
+    Returns:
+        Boolean mask of rects with an aspect ratio between 2:1 and 5:1
+    """
+    out = np.empty(rects.shape[0], np.bool_)
+    for i in range(rects.shape[0]):
+        w = rects[i, 2]
+        h = rects[i, 3]
+        ar = w / h if h else 0.0
+        out[i] = 2.0 <= ar <= 5.0
+    return out
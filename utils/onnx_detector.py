@@ -0,0 +1,134 @@
+"""
+ONNX Plate Detector Module
+Runs an INT8-quantised YOLOv8-nano license plate model with ONNX Runtime.
+"""
+import os
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+
+class ONNXPlateDetector:
+    """Detects license plates with a single-class YOLOv8n ONNX model."""
+
+    MODEL_PATH = os.path.join("models", "yolov8n_plate.onnx")
+    INPUT_SIZE = 640
+    CONF_THRESHOLD = 0.25
+    NMS_THRESHOLD = 0.45
+    PAD_VALUE = 114  # grey padding used by YOLOv8 training
+
+    def __init__(self, model_path: str = MODEL_PATH):
+        """
+        Load the detector, quantising the model to INT8 on first use.
+
+        Args:
+            model_path: Path to the FP32 YOLOv8n plate model
+        """
+        quantized_path = os.path.splitext(model_path)[0] + ".int8.onnx"
+        if not os.path.exists(quantized_path):
+            self._quantize(model_path, quantized_path)
+
+        self.session = ort.InferenceSession(
+            quantized_path,
+            providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    @staticmethod
+    def _quantize(model_path: str, quantized_path: str):
+        """
+        Quantise the model weights to INT8.
+
+        The quantiser needs the `onnx` package, so it is only imported here.
+        Each process writes its own temp file and renames it into place, so
+        workers starting together never load a half-written model.
+
+        Args:
+            model_path: Path to the FP32 model
+            quantized_path: Where to write the INT8 model
+        """
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+        try:
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def detect_plates(self, img: np.ndarray) -> np.ndarray:
+        """
+        Detect license plates in the image.
+
+        Args:
+            img: OpenCV image (BGR format)
+
+        Returns:
+            (N, 4) int32 array of bounding boxes (x, y, w, h) in original image coordinates
+        """
+        height, width = img.shape[:2]
+
+        # Letterbox, then BGR HWC uint8 -> RGB NCHW float in [0, 1]
+        padded, scale, pad_x, pad_y = self._letterbox(img)
+        blob = cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True)
+
+        # Output is (1, 4 + classes, anchors) with boxes as (cx, cy, w, h)
+        output = self.session.run(None, {self.input_name: blob})[0][0].T
+        scores = output[:, 4:].max(axis=1)
+        keep = scores >= self.CONF_THRESHOLD
+        if not keep.any():
+            return np.empty((0, 4), dtype=np.int32)
+
+        boxes = output[keep, :4]
+        scores = scores[keep]
+
+        # Convert to top-left (x, y, w, h) in original image coordinates
+        boxes = boxes.copy()
+        boxes[:, 0] -= pad_x
+        boxes[:, 1] -= pad_y
+        boxes /= scale
+        boxes[:, :2] -= boxes[:, 2:] / 2
+
+        indices = cv2.dnn.NMSBoxes(
+            boxes.tolist(), scores.tolist(), self.CONF_THRESHOLD, self.NMS_THRESHOLD
+        )
+
+        plates = []
+        for i in np.array(indices).flatten():
+            x, y, w, h = boxes[i]
+            x1 = int(max(0, x))
+            y1 = int(max(0, y))
+            x2 = int(min(width, x + w))
+            y2 = int(min(height, y + h))
+            if x2 > x1 and y2 > y1:
+                plates.append((x1, y1, x2 - x1, y2 - y1))
+
+        return np.array(plates, dtype=np.int32).reshape(-1, 4)
+
+    def _letterbox(self, img: np.ndarray):
+        """
+        Resize keeping aspect ratio and pad to a centred INPUT_SIZE square.
+
+        Args:
+            img: OpenCV image (BGR format)
+
+        Returns:
+            Tuple of (padded image, scale, x padding, y padding)
+        """
+        height, width = img.shape[:2]
+        scale = min(self.INPUT_SIZE / width, self.INPUT_SIZE / height)
+        new_width = max(1, round(width * scale))
+        new_height = max(1, round(height * scale))
+        resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+        pad_x = (self.INPUT_SIZE - new_width) // 2
+        pad_y = (self.INPUT_SIZE - new_height) // 2
+        padded = cv2.copyMakeBorder(
+            resized,
+            pad_y, self.INPUT_SIZE - new_height - pad_y,
+            pad_x, self.INPUT_SIZE - new_width - pad_x,
+            cv2.BORDER_CONSTANT, value=(self.PAD_VALUE,) * 3
+        )
+        return padded, scale, pad_x, pad_y
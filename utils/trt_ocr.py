@@ -0,0 +1,303 @@
+"""
+TensorRT OCR Module
+Serves EasyOCR's CRAFT detector and recognizer through TensorRT engines.
+
+The engines are built once from ONNX exports of the EasyOCR models and cached
+per GPU compute capability. The wrappers are drop-in replacements for
+`reader.detector` / `reader.recognizer`, so EasyOCR's own box grouping and CTC
+decoding keep working unchanged on top of the TensorRT forward passes.
+"""
+import logging
+import os
+import subprocess
+import threading
+from typing import Dict, Tuple
+
+import torch
+import tensorrt as trt
+
+logger = logging.getLogger(__name__)
+
+ENGINE_DIR = "trt_engines"
+
+Shape = Tuple[int, ...]
+
+_TORCH_DTYPES = {
+    trt.float32: torch.float32,
+    trt.float16: torch.float16,
+    trt.int32: torch.int32,
+    trt.int64: torch.int64,
+    trt.bool: torch.bool,
+}
+
+
+def _unwrap(model: torch.nn.Module) -> torch.nn.Module:
+    """Strip the DataParallel wrapper EasyOCR adds on GPU."""
+    return model.module if isinstance(model, torch.nn.DataParallel) else model
+
+
+def _shape_arg(shapes: Dict[str, Shape]) -> str:
+    """Format shapes for trtexec, e.g. `input:1x3x32x32`."""
+    return ",".join(f"{name}:{'x'.join(map(str, shape))}" for name, shape in shapes.items())
+
+
+class TRTInferSession:
+    """Runs a serialized TensorRT engine directly on PyTorch CUDA tensors."""
+
+    def __init__(self, engine_path: str, min_shapes: Dict[str, Shape], max_shapes: Dict[str, Shape]):
+        """
+        Load an engine and its execution context.
+
+        Args:
+            engine_path: Path to a serialized TensorRT engine
+            min_shapes: Minimum shape of every input tensor
+            max_shapes: Maximum shape of every input tensor
+        """
+        runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+        with open(engine_path, "rb") as f:
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"Could not deserialize TensorRT engine {engine_path}")
+        self.context = self.engine.create_execution_context()
+        # An execution context holds shapes and bindings, so runs are serialised
+        self._lock = threading.Lock()
+
+        names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.inputs = [n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.INPUT]
+        self.outputs = [n for n in names if self.engine.get_tensor_mode(n) == trt.TensorIOMode.OUTPUT]
+        self.min_shapes = dict(min_shapes)
+        self.max_shapes = dict(max_shapes)
+
+    def fits(self, shapes: Dict[str, Shape]) -> bool:
+        """Check whether the given input shapes are within the engine profile."""
+        return all(
+            len(shape) == len(self.max_shapes[name])
+            and all(lo <= s <= hi for lo, s, hi in zip(self.min_shapes[name], shape, self.max_shapes[name]))
+            for name, shape in shapes.items()
+        )
+
+    def infer(self, feeds: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """
+        Run the engine on CUDA tensors without staging through host memory.
+
+        The engine reads the inputs and writes freshly allocated outputs in
+        place, on PyTorch's current stream.
+
+        Args:
+            feeds: Mapping of input tensor name to CUDA tensor
+
+        Returns:
+            Mapping of output tensor name to CUDA tensor
+        """
+        with self._lock:
+            inputs = {}
+            for name in self.inputs:
+                dtype = _TORCH_DTYPES[self.engine.get_tensor_dtype(name)]
+                # Keep a reference so the converted tensor outlives the launch
+                inputs[name] = feeds[name].to(dtype).contiguous()
+                self.context.set_input_shape(name, tuple(inputs[name].shape))
+                self.context.set_tensor_address(name, inputs[name].data_ptr())
+
+            device = next(iter(inputs.values())).device
+            outputs = {}
+            for name in self.outputs:
+                shape = tuple(self.context.get_tensor_shape(name))
+                dtype = _TORCH_DTYPES[self.engine.get_tensor_dtype(name)]
+                outputs[name] = torch.empty(shape, dtype=dtype, device=device)
+                self.context.set_tensor_address(name, outputs[name].data_ptr())
+
+            stream = torch.cuda.current_stream(device)
+            if not self.context.execute_async_v3(stream.cuda_stream):
+                raise RuntimeError("TensorRT execution failed")
+
+        return outputs
+
+
+class _TRTModule:
+    """Common ONNX export / engine build logic for the EasyOCR wrappers."""
+
+    NAME = ""
+    INPUT_NAME = "input"
+    OUTPUT_NAMES: Tuple[str, ...] = ()
+    # Optimisation profile as (min, opt, max) input shapes
+    PROFILE: Tuple[Shape, Shape, Shape] = ((), (), ())
+    DYNAMIC_AXES: Dict[int, str] = {}
+
+    def __init__(self, model: torch.nn.Module, variant: str = "", engine_dir: str = ENGINE_DIR):
+        """
+        Build (or load the cached) engine for an EasyOCR model.
+
+        Args:
+            model: The EasyOCR torch module being replaced
+            variant: Identifies which weights the model holds, e.g. the
+                recognizer network and language; part of the cache key
+            engine_dir: Directory holding the ONNX exports and engines
+        """
+        self.model = model
+        os.makedirs(engine_dir, exist_ok=True)
+
+        # Exports and engines are only reusable for the same weights and TensorRT
+        stem = "_".join(filter(None, [self.NAME, variant, f"trt{trt.__version__}"]))
+        major, minor = torch.cuda.get_device_capability()
+        onnx_path = os.path.join(engine_dir, f"{stem}.onnx")
+        engine_path = os.path.join(engine_dir, f"{stem}_sm{major}{minor}_fp16.engine")
+
+        self.session = None
+        if os.path.exists(engine_path):
+            try:
+                self.session = self._open_session(engine_path)
+            except RuntimeError as e:
+                logger.warning(f"Rebuilding unusable TensorRT engine: {e}")
+                os.remove(engine_path)
+
+        if self.session is None:
+            if not os.path.exists(onnx_path):
+                self._export_onnx(onnx_path)
+            self._build_engine(onnx_path, engine_path)
+            self.session = self._open_session(engine_path)
+
+    def _open_session(self, engine_path: str) -> TRTInferSession:
+        """Load an engine with this model's input profile."""
+        return TRTInferSession(
+            engine_path, {self.INPUT_NAME: self.PROFILE[0]}, {self.INPUT_NAME: self.PROFILE[2]}
+        )
+
+    def _export_module(self) -> torch.nn.Module:
+        """Return the module to export, producing exactly OUTPUT_NAMES."""
+        return _unwrap(self.model)
+
+    def _export_onnx(self, onnx_path: str):
+        """Export the torch model to ONNX with dynamic input axes."""
+        logger.info(f"Exporting {self.NAME} to {onnx_path}...")
+        module = self._export_module().eval()
+        device = next(module.parameters()).device
+        dummy = torch.zeros(self.PROFILE[1], device=device)
+        with torch.no_grad():
+            torch.onnx.export(
+                module, dummy, onnx_path,
+                input_names=[self.INPUT_NAME],
+                output_names=list(self.OUTPUT_NAMES),
+                dynamic_axes={self.INPUT_NAME: self.DYNAMIC_AXES},
+                opset_version=17,
+            )
+
+    def _build_engine(self, onnx_path: str, engine_path: str):
+        """Build an FP16 engine from the ONNX export using trtexec."""
+        logger.info(f"Building TensorRT engine {engine_path} (one-time)...")
+        min_shape, opt_shape, max_shape = self.PROFILE
+        subprocess.run(
+            [
+                "trtexec",
+                f"--onnx={onnx_path}",
+                "--fp16",
+                f"--minShapes={_shape_arg({self.INPUT_NAME: min_shape})}",
+                f"--optShapes={_shape_arg({self.INPUT_NAME: opt_shape})}",
+                f"--maxShapes={_shape_arg({self.INPUT_NAME: max_shape})}",
+                f"--saveEngine={engine_path}",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    def eval(self):
+        """EasyOCR calls `.eval()` on its models; nothing to switch here."""
+        return self
+
+    def _fits(self, x: torch.Tensor) -> bool:
+        """Check whether the engine can take x; otherwise the torch model runs."""
+        return x.is_cuda and self.session.fits({self.INPUT_NAME: tuple(x.shape)})
+
+    def _run(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Run the engine on x and return its outputs by name."""
+        return self.session.infer({self.INPUT_NAME: x})
+
+
+class _CRAFTExport(torch.nn.Module):
+    """CRAFT with only the score maps exported; `feature` only feeds the refiner."""
+
+    def __init__(self, model: torch.nn.Module):
+        """
+        Args:
+            model: Unwrapped CRAFT torch module
+        """
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        """Return the (N, H/2, W/2, 2) text/link score maps."""
+        y, _ = self.model(x)
+        return y
+
+
+class CRAFTTRT(_TRTModule):
+    """TensorRT replacement for EasyOCR's CRAFT text detector."""
+
+    NAME = "craft"
+    OUTPUT_NAMES = ("y",)
+    # Max is a full micro-batch of 400x200 letterboxed plates, which CRAFT
+    # pads to multiples of 32; larger inputs run on the torch model
+    PROFILE = ((1, 3, 32, 32), (8, 3, 224, 416), (8, 3, 224, 416))
+    DYNAMIC_AXES = {0: "batch", 2: "height", 3: "width"}
+
+    def _export_module(self) -> torch.nn.Module:
+        """Export CRAFT without its unused feature output."""
+        return _CRAFTExport(_unwrap(self.model))
+
+    def __call__(self, x: torch.Tensor):
+        """
+        Run detection.
+
+        Args:
+            x: Normalized image batch (N, 3, H, W)
+
+        Returns:
+            Tuple of (score maps, feature) like the CRAFT torch module; feature
+            is None since no refiner is used
+        """
+        if not self._fits(x):
+            return self.model(x)
+        return self._run(x)["y"].float(), None
+
+
+class _RecognizerExport(torch.nn.Module):
+    """Recognizer with the unused `text` argument dropped for export."""
+
+    def __init__(self, model: torch.nn.Module):
+        """
+        Args:
+            model: Unwrapped recognizer torch module
+        """
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        """Return per-timestep class scores for a batch of text crops."""
+        return self.model(image, None)
+
+
+class RecognizerTRT(_TRTModule):
+    """TensorRT replacement for EasyOCR's CNN+LSTM text recognizer."""
+
+    NAME = "recog"
+    OUTPUT_NAMES = ("preds",)
+    PROFILE = ((1, 1, 64, 32), (1, 1, 64, 256), (16, 1, 64, 2048))
+    DYNAMIC_AXES = {0: "batch", 3: "width"}
+
+    def _export_module(self) -> torch.nn.Module:
+        """Export the recognizer with an image-only signature."""
+        return _RecognizerExport(_unwrap(self.model))
+
+    def __call__(self, image: torch.Tensor, text: torch.Tensor = None):
+        """
+        Run recognition.
+
+        Args:
+            image: Grayscale text crops (N, 1, 64, W)
+            text: Unused, kept for signature compatibility
+
+        Returns:
+            Per-timestep class scores for CTC decoding
+        """
+        if not self._fits(image):
+            return self.model(image, text)
+        return self._run(image)["preds"].float()